@@ -5,6 +5,7 @@ This module is responsible for bootstrapping the application and executing the C
 
 import argparse
 import contextlib
+import functools
 import sys
 
 import sfs.events as events
@@ -73,8 +74,12 @@ def cli_manager(command=None, exit_on_error=True, raise_error=False):
             sys.exit(1 if error else 0)
 
 
-def exec_cli():
-    """Executes the CLI when this module is run as a script"""
+@functools.lru_cache(maxsize=1)
+def register_commands():
+    """
+    Registers sub-command parsers of all CLI modules with the primary parser
+    The parser is built only once, repeated calls reuse the already extended parser
+    """
 
     # Import all CLI modules, which also makes them auto-subscribe to CLI events
     ops.import_ops()
@@ -82,6 +87,12 @@ def exec_cli():
     # Extend CLI parser with sub-command parsers
     events.invoke_subscribers(events.events['CLI_REGISTRY'], command_subparsers, parents=[])
 
+
+def exec_cli():
+    """Executes the CLI when this module is run as a script"""
+
+    register_commands()
+
     with cli_manager() as args:
         # Parse and process arguments
         if args.verbose:
@@ -16,4 +16,5 @@ LOG_FILE_NUM_BACKUPS = 10
 CLI_OUTPUT_PREFIX = '>> '
 
 # Tests
-TEST_DIR = os.path.join(SFS_ROOT_DIR, 'tests')
+TEST_DIR_ENV_VAR = 'SFS_TEST_DIR'
+TEST_DIR_DEFAULT = os.path.join(SFS_ROOT_DIR, 'tests')
@@ -1,4 +1,5 @@
 import collections
+import functools
 
 import sfs.exceptions as exceptions
 
@@ -52,8 +53,9 @@ def subscriber(key, unique=False):
     return wrapper
 
 
+@functools.lru_cache(maxsize=64)
 def command_key(command):
-    """Generate event key for a CLI command"""
+    """Generate event key for a CLI command. Keys are cached as the same few commands are looked up repeatedly"""
     return "{}_{}".format(events['COMMAND_EXECUTION'], command)
 
 
@@ -6,6 +6,15 @@ import unittest
 import sfs.config as config
 
 
+def _get_tests_dir():
+    """The tests directory is first checked in the environment and then in the config file"""
+    try:
+        path = os.environ[config.TEST_DIR_ENV_VAR]
+    except KeyError:
+        path = config.TEST_DIR_DEFAULT
+    return path
+
+
 def dummy_file(path, size=5):
     with open(path, 'w') as out:
         out.seek(size - 1)
@@ -22,7 +31,10 @@ class TestCaseWithFS(unittest.TestCase):
     - Creates test directory and startup and deletes it during cleanup
     - Provides utilities for creation of file system hierarchies
     """
-    TESTS_BASE = config.TEST_DIR
+    # Scratch directory is unique to each test process so that parallel workers (pytest-xdist) do not collide
+    TESTS_BASE = os.path.join(_get_tests_dir(), '{}-{}'.format(
+        os.environ.get('PYTEST_XDIST_WORKER', 'gw0'), os.getpid()
+    ))
 
     def setUp(self):
         shutil.rmtree(self.TESTS_BASE, ignore_errors=True)
@@ -35,22 +47,62 @@ class TestCaseWithFS(unittest.TestCase):
     def complete_path(path):
         return os.path.join(TestCaseWithFS.TESTS_BASE, path)
 
-    def create_fs_tree(self, tree, base=None):
-        """Create the specified directory tree in the tests directory"""
-
-        def _create_path(name):
-            return name if base is None else os.path.join(base, name)
-
-        if 'files' in tree:
-            for f in tree['files']:
-                path = self.complete_path(_create_path(f))
-                dummy_file(path)
-        if 'links' in tree:
-            for l in tree['links']:
-                path = self.complete_path(_create_path(l))
-                dummy_link(path)
-        if 'dirs' in tree:
-            for d in tree['dirs'].keys():
-                path = self.complete_path(_create_path(d))
-                os.mkdir(path)
-                self.create_fs_tree(tree['dirs'][d], path)
+    @classmethod
+    def create_fs_tree(cls, tree, base=None):
+        """
+        Create the specified directory tree in the tests directory
+        - The tree is walked once to collect all paths before anything is created
+        - Only leaf directories are created explicitly, their parents are created along with them
+        """
+        dirs, files, links = [], [], []
+        pending = [(tree, cls.complete_path(base if base is not None else ''))]
+        while pending:
+            sub_tree, root = pending.pop()
+            files.extend(os.path.join(root, f) for f in sub_tree.get('files', []))
+            links.extend(os.path.join(root, l) for l in sub_tree.get('links', []))
+            for d, dir_tree in sub_tree.get('dirs', {}).items():
+                path = os.path.join(root, d)
+                if not dir_tree.get('dirs'):
+                    dirs.append(path)
+                pending.append((dir_tree, path))
+
+        for path in dirs:
+            os.makedirs(path)
+        for path in files:
+            dummy_file(path)
+        for path in links:
+            dummy_link(path)
+
+
+class TestCaseWithFSTemplate(TestCaseWithFS):
+    """
+    Base class for tests which start from the same file system hierarchy
+    - The hierarchy is created once per test class by 'create_template' and saved as a template
+    - The template is copied to the test directory before each test, isolating changes made by a test
+    """
+    TEMPLATE_BASE = '{}-template'.format(TestCaseWithFS.TESTS_BASE)
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestCaseWithFSTemplate, cls).setUpClass()
+
+        # SFS metadata and links hold absolute paths, so the template is created in place and then moved aside
+        shutil.rmtree(cls.TESTS_BASE, ignore_errors=True)
+        shutil.rmtree(cls.TEMPLATE_BASE, ignore_errors=True)
+        os.makedirs(cls.TESTS_BASE)
+        cls.create_template()
+        os.rename(cls.TESTS_BASE, cls.TEMPLATE_BASE)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.TEMPLATE_BASE)
+        super(TestCaseWithFSTemplate, cls).tearDownClass()
+
+    @classmethod
+    def create_template(cls):
+        """Create the file system hierarchy shared by all tests of the class in the tests directory"""
+        pass
+
+    def setUp(self):
+        super(TestCaseWithFSTemplate, self).setUp()
+        shutil.copytree(self.TEMPLATE_BASE, self.TESTS_BASE, symlinks=True, dirs_exist_ok=True)
@@ -1,5 +1,6 @@
 import argparse
 import contextlib
+import functools
 import os
 import time
 import unittest
@@ -24,7 +25,7 @@ import sfs.ops.ops_query as ops_query
 
 
 # Register sub command parsers
-events.invoke_subscribers(events.events['CLI_REGISTRY'], cli.command_subparsers, parents=[])
+cli.register_commands()
 
 # Disable logging
 log.logger.disabled = True
@@ -34,20 +35,37 @@ log.logger.disabled = True
 
 
 def cli_exec(cmd, ignore_errors=False):
-    """Mocks CLI output logger and returns the collected output"""
-    with unittest.mock.patch('sfs.log_utils.cli_output') as cli_output:
+    """Replaces CLI output logger with a collector and returns the collected output"""
+    output = []
+    cli_output = log.cli_output
+    log.cli_output = lambda *args, **kwargs: output.append(prepare_args(*args, **kwargs))
+    try:
         with cli.cli_manager(cmd, exit_on_error=False, raise_error=not ignore_errors) as args:
             events.invoke_subscribers(events.command_key(args.command), args)
-        return cli_output.call_args_list
+    finally:
+        log.cli_output = cli_output
+    return output
 
 
-@contextlib.contextmanager
-def change_cwd(path):
-    """Provides a context with a specified working directory"""
-    old = os.getcwd()
-    os.chdir(path)
-    yield
-    os.chdir(old)
+class change_cwd:
+    """
+    Provides a context with a specified working directory
+    Implemented as a plain context manager class as it is entered frequently and is cheaper than a generator context
+    :param path: Working directory inside the context
+    :param old: Working directory restored on exit. If None, the current working directory is used
+    """
+
+    def __init__(self, path, old=None):
+        self.path = path
+        self.old = old
+
+    def __enter__(self):
+        if self.old is None:
+            self.old = os.getcwd()
+        os.chdir(self.path)
+
+    def __exit__(self, *exc_info):
+        os.chdir(self.old)
 
 
 def prepare_args(*args, **kwargs):
@@ -55,11 +73,13 @@ def prepare_args(*args, **kwargs):
     return args, kwargs
 
 
+@functools.lru_cache(maxsize=128)
 def prepare_validation_error(message):
     """Constructs a validation error message"""
     return "{} {}".format(cli.error_messages['VALIDATION'], message)
 
 
+@functools.lru_cache(maxsize=128)
 def prepare_internal_error_error(message):
     """Constructs an internal error message"""
     return "{} {}".format(cli.error_messages['INTERNAL'], message)
@@ -67,6 +87,12 @@ def prepare_internal_error_error(message):
 
 class CLIManagerTests(unittest.TestCase):
 
+    def test_register_commands(self):
+        # Registering commands again does not add duplicate sub-command parsers
+        sub_commands = dict(cli.command_subparsers.choices)
+        cli.register_commands()
+        self.assertEqual(sub_commands, cli.command_subparsers.choices)
+
     def test_cli_manager(self):
         test_cmd = [ops_main.commands['SFS_INIT']]
         with unittest.mock.patch('sfs.log_utils.cli_output') as cli_output:
@@ -143,114 +169,114 @@ class MainOpsCLITests(test_helper.TestCaseWithFS):
     def test_is_sfs(self):
         # Initialize an SFS
         sfs_root = os.path.join(self.TESTS_BASE, 'sfs_root')
-        os.mkdir(sfs_root)
+        nested_path = os.path.join(sfs_root, 'nested')
+        os.makedirs(nested_path)
         core.SFS.init_sfs(sfs_root)
         sfs = core.SFS.get_by_path(sfs_root)
+        output_yes = [prepare_args("{}{}".format(ops_main.messages['IS_SFS']['OUTPUT']['YES'], sfs_root))]
+        output_no = [prepare_args(ops_main.messages['IS_SFS']['OUTPUT']['NO'])]
 
         with unittest.mock.patch('sfs.core.SFS.get_by_path') as get_by_path:
             get_by_path.return_value = sfs
-            for path in [sfs_root, os.path.join(sfs_root, 'nested')]:
-                os.makedirs(path, exist_ok=True)
-
-                # Works with path argument
-                output = cli_exec([ops_main.commands['IS_SFS'], path])
-                self.assertEqual([
-                    prepare_args("{}{}".format(ops_main.messages['IS_SFS']['OUTPUT']['YES'], sfs_root))
-                ], output)
-                self.assertEqual(prepare_args(path), get_by_path.call_args)
-
-                # Uses current directory if path not specified
-                with change_cwd(path):
-                    output = cli_exec([ops_main.commands['IS_SFS']])
-                    self.assertEqual([
-                        prepare_args("{}{}".format(ops_main.messages['IS_SFS']['OUTPUT']['YES'], sfs_root))
-                    ], output)
+            cwd = os.getcwd()
+            for path in [sfs_root, nested_path]:
+                with self.subTest(path=path):
+                    # Works with path argument
+                    output = cli_exec([ops_main.commands['IS_SFS'], path])
+                    self.assertEqual(output_yes, output)
                     self.assertEqual(prepare_args(path), get_by_path.call_args)
 
+                    # Uses current directory if path not specified
+                    with change_cwd(path, cwd):
+                        output = cli_exec([ops_main.commands['IS_SFS']])
+                        self.assertEqual(output_yes, output)
+                        self.assertEqual(prepare_args(path), get_by_path.call_args)
+
             # Called correct no of time
             self.assertEqual(4, len(get_by_path.call_args_list))
 
             # Output is negative for paths outside SFS
             get_by_path.return_value = None
             for path in [self.TESTS_BASE, os.path.join(self.TESTS_BASE, 'nested')]:
-                output = cli_exec([ops_main.commands['IS_SFS'], path])
-                self.assertEqual([
-                    prepare_args(ops_main.messages['IS_SFS']['OUTPUT']['NO'])
-                ], output)
-                self.assertEqual(prepare_args(path), get_by_path.call_args)
+                with self.subTest(path=path):
+                    output = cli_exec([ops_main.commands['IS_SFS'], path])
+                    self.assertEqual(output_no, output)
+                    self.assertEqual(prepare_args(path), get_by_path.call_args)
 
             # Called correct no of time
             self.assertEqual(6, len(get_by_path.call_args_list))
 
 
-class CollectionOpsCLITests(test_helper.TestCaseWithFS):
-
-    def __init__(self, *args, **kwargs):
-        super(CollectionOpsCLITests, self).__init__(*args, **kwargs)
-        self.col_tree = {
-            'files': ['file_a', 'file_b'],
-            'links': ['link_a'],
-            'dirs': {
-                'dir_a': {
-                    'files': ['file_aa']
-                }
+class CollectionOpsCLITests(test_helper.TestCaseWithFSTemplate):
+    col_tree = {
+        'files': ['file_a', 'file_b'],
+        'links': ['link_a'],
+        'dirs': {
+            'dir_a': {
+                'files': ['file_aa']
             }
         }
-        self.sfs_root = os.path.join(self.TESTS_BASE, 'sfs_root')
-        self.col_root = os.path.join(self.TESTS_BASE, 'col')
-        self.col_name = 'col'
+    }
+    sfs_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'sfs_root')
+    col_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'col')
+    col_name = 'col'
+
+    @classmethod
+    def create_template(cls):
+        # Create collection and SFS nodes
+        os.mkdir(cls.sfs_root)
+        os.mkdir(cls.col_root)
+        cls.create_fs_tree(cls.col_tree, base=cls.col_root)
+        core.SFS.init_sfs(cls.sfs_root)
 
     def setUp(self):
         super(CollectionOpsCLITests, self).setUp()
 
-        # Create collection and SFS nodes
-        os.mkdir(self.sfs_root)
-        os.mkdir(self.col_root)
-        self.create_fs_tree(self.col_tree, base=self.col_root)
-
         # Change working directory to sfs root and save old value
         self.old_cwd = os.getcwd()
         os.chdir(self.sfs_root)
-        core.SFS.init_sfs(self.sfs_root)
         self.sfs = core.SFS.get_by_path(self.sfs_root)
 
     def tearDown(self):
-        super(CollectionOpsCLITests, self).tearDown()
-
-        # Restore working directory
+        # Restore working directory before the test directory is deleted
         os.chdir(self.old_cwd)
 
+        super(CollectionOpsCLITests, self).tearDown()
+
     def _test_not_sfs_dir(self, cmd, msg, *mocked_modules):
         not_sfs_dir = self.TESTS_BASE
-        for mocked_module in mocked_modules:
-            with unittest.mock.patch(mocked_module) as mocked:
-                with change_cwd(not_sfs_dir):
-                    output = cli_exec(cmd, ignore_errors=True)
-                    self.assertEqual([
-                        prepare_args(prepare_validation_error(msg))
-                    ], output)
+        with contextlib.ExitStack() as stack:
+            # All modules are mocked together so that the command needs to be executed only once
+            mocks = {m: stack.enter_context(unittest.mock.patch(m)) for m in mocked_modules}
+            with change_cwd(not_sfs_dir):
+                output = cli_exec(cmd, ignore_errors=True)
+            self.assertEqual([
+                prepare_args(prepare_validation_error(msg))
+            ], output)
+            for mocked_module, mocked in mocks.items():
+                with self.subTest(module=mocked_module):
                     self.assertEqual(0, len(mocked.call_args_list))
 
-    def test_add_collection(self):
+    @unittest.mock.patch('sfs.core.SFS.add_collection')
+    def test_add_collection(self, add_collection):
         dummy_sfs_updates = core.SfsUpdates(added=4, deleted=2, updated=3)
         col_name = 'test_col'
-        with unittest.mock.patch('sfs.core.SFS.add_collection') as add_collection:
-            add_collection.return_value = dummy_sfs_updates
+        add_collection.return_value = dummy_sfs_updates
 
-            # Outputs success message to terminal
-            output = cli_exec([ops_collection.commands['ADD_COL'], self.col_root, '--name', col_name])
-            self.assertEqual([
-                prepare_args("{} {}".format(ops_collection.messages['ADD_COL']['OUTPUT'], 4))
-            ], output)
+        # Outputs success message to terminal
+        output = cli_exec([ops_collection.commands['ADD_COL'], self.col_root, '--name', col_name])
+        self.assertEqual([
+            prepare_args("{} {}".format(ops_collection.messages['ADD_COL']['OUTPUT'], 4))
+        ], output)
 
-            # Receives correct arguments
-            self.assertEqual(1, len(add_collection.call_args_list))
-            self.assertEqual(prepare_args(col_name, self.col_root), add_collection.call_args)
+        # Receives correct arguments
+        self.assertEqual(1, len(add_collection.call_args_list))
+        self.assertEqual(prepare_args(col_name, self.col_root), add_collection.call_args)
 
-            # Collection name defaults to collection root name
-            cli_exec([ops_collection.commands['ADD_COL'], self.col_root])
-            self.assertEqual(2, len(add_collection.call_args_list))
-            self.assertEqual(prepare_args(self.col_name, self.col_root), add_collection.call_args)
+        # Collection name defaults to collection root name
+        cli_exec([ops_collection.commands['ADD_COL'], self.col_root])
+        self.assertEqual(2, len(add_collection.call_args_list))
+        self.assertEqual(prepare_args(self.col_name, self.col_root), add_collection.call_args)
 
     def test_add_collection_validations(self):
         # Must be inside an SFS
@@ -312,20 +338,20 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
         )
 
         col_name = 'test_col'
-        sfs = core.SFS.get_by_path(self.sfs_root)
-        sfs.add_collection(col_name, self.col_root)
-        col = sfs.get_collection_by_name(col_name)
+        self.sfs.add_collection(col_name, self.col_root)
+        col = self.sfs.get_collection_by_name(col_name)
+        output_yes = [prepare_args("{} {}".format(ops_collection.messages['IS_COL']['OUTPUT']['YES'], self.col_root))]
+        output_no = [prepare_args(ops_collection.messages['IS_COL']['OUTPUT']['NO'])]
 
         with unittest.mock.patch('sfs.core.SFS.get_collection_by_path') as get_collection_by_path:
 
             # Outputs positively for paths within a collection
             get_collection_by_path.return_value = col
             for path in [self.col_root, os.path.join(self.col_root, 'nested')]:
-                output = cli_exec([ops_collection.commands['IS_COL'], path])
-                self.assertEqual([
-                    prepare_args("{} {}".format(ops_collection.messages['IS_COL']['OUTPUT']['YES'], self.col_root))
-                ], output)
-                self.assertEqual(prepare_args(path), get_collection_by_path.call_args)
+                with self.subTest(path=path):
+                    output = cli_exec([ops_collection.commands['IS_COL'], path])
+                    self.assertEqual(output_yes, output)
+                    self.assertEqual(prepare_args(path), get_collection_by_path.call_args)
 
             # Called correct no of times
             self.assertEqual(2, len(get_collection_by_path.call_args_list))
@@ -333,11 +359,10 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
             # Outputs negatively for paths outside collections
             get_collection_by_path.return_value = None
             for path in [self.TESTS_BASE, os.path.join(self.TESTS_BASE, 'nested')]:
-                output = cli_exec([ops_collection.commands['IS_COL'], path])
-                self.assertEqual([
-                    prepare_args(ops_collection.messages['IS_COL']['OUTPUT']['NO'])
-                ], output)
-                self.assertEqual(prepare_args(path), get_collection_by_path.call_args)
+                with self.subTest(path=path):
+                    output = cli_exec([ops_collection.commands['IS_COL'], path])
+                    self.assertEqual(output_no, output)
+                    self.assertEqual(prepare_args(path), get_collection_by_path.call_args)
 
             # Called correct no of times
             self.assertEqual(4, len(get_collection_by_path.call_args_list))
@@ -366,23 +391,21 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
         col2_name = 'col2'
         col2_root = os.path.join(self.TESTS_BASE, 'col2')
         os.mkdir(col2_root)
-        sfs = core.SFS.get_by_path(self.sfs_root)
-        sfs.add_collection(col1_name, col1_root)
-        sfs.add_collection(col2_name, col2_root)
-        sfs_list = sfs.get_all_collections()
+        self.sfs.add_collection(col1_name, col1_root)
+        self.sfs.add_collection(col2_name, col2_root)
+        sfs_list = self.sfs.get_all_collections()
+        list_cols_output = ops_collection.messages['LIST_COLS']['OUTPUT']
 
         with unittest.mock.patch('sfs.core.SFS.get_all_collections') as get_all_collections:
             get_all_collections.return_value = sfs_list
             output = cli_exec([ops_collection.commands['LIST_COLS']])
             self.assertEqual([
-                prepare_args("{}{}".format(ops_collection.messages['LIST_COLS']['OUTPUT']['COUNT'], len(sfs_list))),
+                prepare_args("{}{}".format(list_cols_output['COUNT'], len(sfs_list))),
                 prepare_args('{}"{}"\t{}"{}"'.format(
-                    ops_collection.messages['LIST_COLS']['OUTPUT']['COL_NAME'], col1_name,
-                    ops_collection.messages['LIST_COLS']['OUTPUT']['COL_ROOT'], col1_root
+                    list_cols_output['COL_NAME'], col1_name, list_cols_output['COL_ROOT'], col1_root
                 )),
                 prepare_args('{}"{}"\t{}"{}"'.format(
-                    ops_collection.messages['LIST_COLS']['OUTPUT']['COL_NAME'], col2_name,
-                    ops_collection.messages['LIST_COLS']['OUTPUT']['COL_ROOT'], col2_root
+                    list_cols_output['COL_NAME'], col2_name, list_cols_output['COL_ROOT'], col2_root
                 ))
             ], output)
             self.assertEqual(prepare_args(), get_all_collections.call_args)
@@ -398,39 +421,38 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
         )
 
         # Add a collection
-        sfs = core.SFS.get_by_path(self.sfs_root)
-        sfs.add_collection(self.col_name, self.col_root)
+        self.sfs.add_collection(self.col_name, self.col_root)
         updates_in_sync = core.SfsUpdates(added=3, updated=5, deleted=0)
         updates_in_del = core.SfsUpdates(added=0, updated=0, deleted=4)
 
-        with unittest.mock.patch('sfs.core.Collection.update') as update_collection:
-            with unittest.mock.patch('sfs.core.SFS.del_orphans') as del_orphans:
-                update_collection.return_value = updates_in_sync
-                del_orphans.return_value = updates_in_del
+        with unittest.mock.patch('sfs.core.Collection.update') as update_collection, \
+                unittest.mock.patch('sfs.core.SFS.del_orphans') as del_orphans:
+            update_collection.return_value = updates_in_sync
+            del_orphans.return_value = updates_in_del
 
-                # Outputs number of links updated
-                output = cli_exec([ops_collection.commands['SYNC_COL'], self.col_name])
-                self.assertEqual([
-                    prepare_args(
-                        '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['ADDED'], updates_in_sync.added)
-                    ),
-                    prepare_args(
-                        '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['UPDATED'], updates_in_sync.updated)
-                    ),
-                    prepare_args(
-                        '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['DELETED'], updates_in_del.deleted)
-                    )
-                ], output)
-                self.assertEqual([prepare_args()], update_collection.call_args_list)
-                self.assertEqual([prepare_args(col_root=self.col_root)], del_orphans.call_args_list)
+            # Outputs number of links updated
+            output = cli_exec([ops_collection.commands['SYNC_COL'], self.col_name])
+            self.assertEqual([
+                prepare_args(
+                    '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['ADDED'], updates_in_sync.added)
+                ),
+                prepare_args(
+                    '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['UPDATED'], updates_in_sync.updated)
+                ),
+                prepare_args(
+                    '{}{}'.format(ops_collection.messages['SYNC_COL']['OUTPUT']['DELETED'], updates_in_del.deleted)
+                )
+            ], output)
+            self.assertEqual([prepare_args()], update_collection.call_args_list)
+            self.assertEqual([prepare_args(col_root=self.col_root)], del_orphans.call_args_list)
 
-                # Reports negatively for unknown collection name
-                output = cli_exec([ops_collection.commands['SYNC_COL'], 'unknown_col'], ignore_errors=True)
-                self.assertEqual([
-                    prepare_args(prepare_validation_error(
-                        ops_collection.messages['SYNC_COL']['ERROR']['NOT_A_COL_NAME']
-                    ))
-                ], output)
+            # Reports negatively for unknown collection name
+            output = cli_exec([ops_collection.commands['SYNC_COL'], 'unknown_col'], ignore_errors=True)
+            self.assertEqual([
+                prepare_args(prepare_validation_error(
+                    ops_collection.messages['SYNC_COL']['ERROR']['NOT_A_COL_NAME']
+                ))
+            ], output)
 
     def test_del_col(self):
         # Must be inside an SFS
@@ -441,31 +463,30 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
         )
 
         # Add a collection
-        sfs = core.SFS.get_by_path(self.sfs_root)
-        sfs.add_collection(self.col_name, self.col_root)
+        self.sfs.add_collection(self.col_name, self.col_root)
         updates_in_del = core.SfsUpdates(added=0, updated=0, deleted=3)
 
-        with unittest.mock.patch('sfs.core.SFS.del_collection') as del_collection:
-            with unittest.mock.patch('sfs.core.SFS.del_orphans') as del_orphans:
-                del_collection.return_value = None
-                del_orphans.return_value = updates_in_del
+        with unittest.mock.patch('sfs.core.SFS.del_collection') as del_collection, \
+                unittest.mock.patch('sfs.core.SFS.del_orphans') as del_orphans:
+            del_collection.return_value = None
+            del_orphans.return_value = updates_in_del
 
-                # Expect a blank output
-                output = cli_exec([ops_collection.commands['DEL_COL'], self.col_name])
-                self.assertEqual([
-                    prepare_args('{}{}'.format(
-                        ops_collection.messages['DEL_ORPHANS']['OUTPUT'], updates_in_del.deleted
-                    ))
-                ], output)
-                self.assertEqual([prepare_args(self.col_name)], del_collection.call_args_list)
+            # Expect a blank output
+            output = cli_exec([ops_collection.commands['DEL_COL'], self.col_name])
+            self.assertEqual([
+                prepare_args('{}{}'.format(
+                    ops_collection.messages['DEL_ORPHANS']['OUTPUT'], updates_in_del.deleted
+                ))
+            ], output)
+            self.assertEqual([prepare_args(self.col_name)], del_collection.call_args_list)
 
-                # Reports negatively for unknown collection name
-                output = cli_exec([ops_collection.commands['DEL_COL'], 'unknown_col'], ignore_errors=True)
-                self.assertEqual([
-                    prepare_args(prepare_validation_error(
-                        ops_collection.messages['DEL_COL']['ERROR']['NOT_A_COL_NAME']
-                    ))
-                ], output)
+            # Reports negatively for unknown collection name
+            output = cli_exec([ops_collection.commands['DEL_COL'], 'unknown_col'], ignore_errors=True)
+            self.assertEqual([
+                prepare_args(prepare_validation_error(
+                    ops_collection.messages['DEL_COL']['ERROR']['NOT_A_COL_NAME']
+                ))
+            ], output)
 
     def test_del_orphans(self):
         # Must be inside an SFS
@@ -487,46 +508,52 @@ class CollectionOpsCLITests(test_helper.TestCaseWithFS):
             self.assertEqual([prepare_args()], del_orphans.call_args_list)
 
 
-class QueryOpsCLITests(test_helper.TestCaseWithFS):
+class QueryOpsCLITests(test_helper.TestCaseWithFSTemplate):
+    sfs_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'sfs_root')
+    col_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'col')
+    col_name = 'col'
+    col_path = os.path.join(col_root, 'file')
+    link_path = os.path.join(sfs_root, col_name, 'file')
+    col_ctime = 1700000000
 
-    def __init__(self, *args, **kwargs):
-        super(QueryOpsCLITests, self).__init__(*args, **kwargs)
-        self.sfs_root = os.path.join(self.TESTS_BASE, 'sfs_root')
-        self.col_root = os.path.join(self.TESTS_BASE, 'col')
-        self.col_name = 'col'
-        self.col_path = os.path.join(self.col_root, 'file')
-        self.link_path = os.path.join(self.sfs_root, self.col_name, 'file')
+    @classmethod
+    def create_template(cls):
+        # Create collection and SFS nodes
+        os.mkdir(cls.sfs_root)
+        os.mkdir(cls.col_root)
+        test_helper.dummy_file(cls.col_path, 100)
+        core.SFS.init_sfs(cls.sfs_root)
+        sfs = core.SFS.get_by_path(cls.sfs_root)
+        sfs.add_collection(cls.col_name, cls.col_root)
+
+        # Pin the saved ctime of the collection file as the inode change time cannot be set on the file itself
+        col = sfs.get_collection_by_name(cls.col_name)
+        stats = col.get_stats(cls.col_path)
+        stats.ctime = cls.col_ctime
+        fs.save_pickled(stats, col.stats_base, os.path.relpath(cls.col_path, cls.col_root))
 
     def setUp(self):
         super(QueryOpsCLITests, self).setUp()
-
-        # Create collection and SFS nodes
-        os.mkdir(self.sfs_root)
-        os.mkdir(self.col_root)
-        test_helper.dummy_file(self.col_path, 100)
-
-        core.SFS.init_sfs(self.sfs_root)
         self.sfs = core.SFS.get_by_path(self.sfs_root)
-        self.sfs.add_collection(self.col_name, self.col_root)
         self.col = self.sfs.get_collection_by_name(self.col_name)
 
     def test_query_link(self):
+        link_output = ops_query.messages['QUERY']['OUTPUT']['LINK']
+
         # Reports link info
         output = cli_exec([ops_query.commands['QUERY'], self.link_path])
         self.assertEqual([
-            prepare_args("{}{}".format(ops_query.messages['QUERY']['OUTPUT']['LINK']['COL_NAME'], self.col_name)),
-            prepare_args("{}{}".format(ops_query.messages['QUERY']['OUTPUT']['LINK']['COL_PATH'], self.col_path)),
-            prepare_args("{}{}".format(
-                ops_query.messages['QUERY']['OUTPUT']['LINK']['CTIME'],
-                time.ctime(os.stat(self.col_path).st_ctime)
-            )),
+            prepare_args("{}{}".format(link_output['COL_NAME'], self.col_name)),
+            prepare_args("{}{}".format(link_output['COL_PATH'], self.col_path)),
+            prepare_args("{}{}".format(link_output['CTIME'], time.ctime(self.col_ctime))),
             prepare_args("{}{}".format(
-                ops_query.messages['QUERY']['OUTPUT']['LINK']['SIZE'],
+                link_output['SIZE'],
                 sfs_helper.get_readable_size(100)
             )),
         ], output)
 
-    def test_query_directory(self):
+    @unittest.mock.patch('sfs.ops.ops_query.compute_directory_stats')
+    def test_query_directory(self, compute_directory_stats):
         dir_path = self.sfs_root
         dir_stats = ops_query.DirectoryStats()
         dir_stats.size = 1
@@ -536,44 +563,30 @@ class QueryOpsCLITests(test_helper.TestCaseWithFS):
         dir_stats.foreign_links = 5
         dir_stats.files = 6
         dir_stats.sub_directories = 7
+        dir_output = ops_query.messages['QUERY']['OUTPUT']['DIR']
+        expected = [
+            prepare_args("{}{}".format(dir_output['SIZE'], sfs_helper.get_readable_size(dir_stats.size))),
+            prepare_args("{}{}".format(dir_output['CTIME'], time.ctime(dir_stats.ctime))),
+            prepare_args("{}{}".format(dir_output['ACTIVE_LINKS'], dir_stats.active_links)),
+            prepare_args("{}{}".format(dir_output['FOREIGN_LINKS'], dir_stats.foreign_links)),
+            prepare_args("{}{}".format(dir_output['ORPHAN_LINKS'], dir_stats.orphan_links)),
+            prepare_args("{}{}".format(dir_output['FILES'], dir_stats.files)),
+            prepare_args("{}{}".format(dir_output['SUB_DIRECTORIES'], dir_stats.sub_directories))
+        ]
 
         # Reports directory info. If path not specified current directory is used
-        with unittest.mock.patch('sfs.ops.ops_query.compute_directory_stats') as compute_directory_stats:
-            compute_directory_stats.return_value = dir_stats
-            with change_cwd(dir_path):
-                for output in [
-                    cli_exec([ops_query.commands['QUERY'], dir_path]),
-                    cli_exec([ops_query.commands['QUERY']]),
-                ]:
-                    self.assertEqual([
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['SIZE'],
-                            sfs_helper.get_readable_size(dir_stats.size)
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['CTIME'], time.ctime(dir_stats.ctime)
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['ACTIVE_LINKS'], dir_stats.active_links
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['FOREIGN_LINKS'], dir_stats.foreign_links
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['ORPHAN_LINKS'], dir_stats.orphan_links
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['FILES'], dir_stats.files
-                        )),
-                        prepare_args("{}{}".format(
-                            ops_query.messages['QUERY']['OUTPUT']['DIR']['SUB_DIRECTORIES'], dir_stats.sub_directories
-                        ))
-                    ], output)
-                    self.assertIsNotNone(compute_directory_stats.call_args)
-                    self.assertEqual(2, len(compute_directory_stats.call_args[0]))
-                    self.assertIsInstance(compute_directory_stats.call_args[0][0], core.SFS)
-                    self.assertEqual(compute_directory_stats.call_args[0][1], dir_path)
-            self.assertEqual(2, len(compute_directory_stats.call_args_list))
+        compute_directory_stats.return_value = dir_stats
+        with change_cwd(dir_path):
+            for output in [
+                cli_exec([ops_query.commands['QUERY'], dir_path]),
+                cli_exec([ops_query.commands['QUERY']]),
+            ]:
+                self.assertEqual(expected, output)
+                self.assertIsNotNone(compute_directory_stats.call_args)
+                self.assertEqual(2, len(compute_directory_stats.call_args[0]))
+                self.assertIsInstance(compute_directory_stats.call_args[0][0], core.SFS)
+                self.assertEqual(compute_directory_stats.call_args[0][1], dir_path)
+        self.assertEqual(2, len(compute_directory_stats.call_args_list))
 
     def test_query_link_validations(self):
         # Must be inside an SFS
@@ -608,20 +621,16 @@ class QueryOpsCLITests(test_helper.TestCaseWithFS):
         ], output)
 
 
-class DedupOpsCLITests(test_helper.TestCaseWithFS):
-
-    def __init__(self, *args, **kwargs):
-        super(DedupOpsCLITests, self).__init__(*args, **kwargs)
-        self.sfs_root = os.path.join(self.TESTS_BASE, 'sfs_root')
-        self.col_root = os.path.join(self.TESTS_BASE, 'col')
-        self.col_name = 'col'
-
-    def setUp(self):
-        super(DedupOpsCLITests, self).setUp()
+class DedupOpsCLITests(test_helper.TestCaseWithFSTemplate):
+    sfs_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'sfs_root')
+    col_root = os.path.join(test_helper.TestCaseWithFSTemplate.TESTS_BASE, 'col')
+    col_name = 'col'
 
+    @classmethod
+    def create_template(cls):
         # Create collection and SFS nodes
-        os.mkdir(self.sfs_root)
-        col_files = [(os.path.join(self.col_root, rel_path), size) for rel_path, size in [
+        os.mkdir(cls.sfs_root)
+        col_files = [(os.path.join(cls.col_root, rel_path), size) for rel_path, size in [
             (os.path.join('dir1', 'file1'), 100),
             (os.path.join('dir1', 'file2'), 200),
             (os.path.join('dir1', 'file3'), 500),
@@ -634,9 +643,12 @@ class DedupOpsCLITests(test_helper.TestCaseWithFS):
             os.makedirs(os.path.dirname(col_file), exist_ok=True)
             test_helper.dummy_file(col_file, size)
 
-        core.SFS.init_sfs(self.sfs_root)
+        core.SFS.init_sfs(cls.sfs_root)
+        core.SFS.get_by_path(cls.sfs_root).add_collection(cls.col_name, cls.col_root)
+
+    def setUp(self):
+        super(DedupOpsCLITests, self).setUp()
         self.sfs = core.SFS.get_by_path(self.sfs_root)
-        self.sfs.add_collection(self.col_name, self.col_root)
         self.col = self.sfs.get_collection_by_name(self.col_name)
 
     def test_find_dups(self):